@@ -1,8 +1,34 @@
+import io
 import os
+import mmap
+import multiprocessing
+import shutil
+import tempfile
 import zipfile
 import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+
+def _parse_csv_range(processor, csv_path, header, byte_range, chunksize):
+    """
+    Parse one newline-aligned byte range of an AIS CSV.
+    Returns (first arrivals, latest static attributes per vessel) for the range.
+    The attributes are None unless the processor keeps a vessel dimension (compact_visits).
+    """
+    start, end = byte_range
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Same reader path as the serial version so dtypes are inferred the same way
+    reader = pd.read_csv(io.BytesIO(header + data), chunksize=chunksize)
+    chunk = next(reader)
+    vessels = processor.extract_vessel_attributes(chunk) if processor.compact_visits else None
+    return processor.extract_first_arrivals_anywhere(chunk), vessels
+
 
 class AISPortVisitProcessor:
     """
@@ -46,8 +72,26 @@ class AISPortVisitProcessor:
         "Unknown": (None, None, None, None),  # fallback
     }
 
-    def __init__(self, buffer_degrees: float = 1.3):
+    # Per-vessel fields kept in the vessel dimension instead of on every visit
+    VESSEL_STATIC_COLS = [
+        "VesselName", "IMO", "CallSign", "VesselType", "Length", "Width",
+        "Draft", "Cargo", "TranscieverClass",
+    ]
+    VESSEL_DIM_COLS = ["Vessel_ID", "MMSI"] + VESSEL_STATIC_COLS + ["Last_Seen"]
+
+    def __init__(self, buffer_degrees: float = 1.3, parse_workers: int = 1, compact_visits: bool = False):
+        """
+        buffer_degrees: margin added around each port's bounding box
+        parse_workers: processes used to parse a single daily CSV (1 = serial reader)
+        compact_visits: if True, maintain the vessel dimension (self.vessels) while parsing
+            and have run() return visit facts keyed by Vessel_ID, with the static vessel
+            fields moved to the dimension. Off by default, so plain ingests skip that work.
+        """
         self.buffer = buffer_degrees
+        self.parse_workers = parse_workers
+        self.compact_visits = compact_visits
+        self.vessels = pd.DataFrame(columns=self.VESSEL_DIM_COLS)
+        self._updated_mmsi = set()
 
     def get_port_name(self, lat: float, lon: float) -> str:
         """Return the port name for given coordinates or 'Unknown'."""
@@ -69,12 +113,16 @@ class AISPortVisitProcessor:
         )
         return df
 
-    def extract_first_arrivals_anywhere(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Filter by relevant vessel types
-        df = df[
+    def filter_vessel_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Keep cargo, tanker, fishing (30) and tug (52) vessels."""
+        return df[
             df["VesselType"].isin(range(70, 90)) | df["VesselType"].isin([30, 52])
         ].copy()
 
+    def extract_first_arrivals_anywhere(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Filter by relevant vessel types
+        df = self.filter_vessel_types(df)
+
         # Drop rows with missing or invalid coordinates
         df = df.dropna(subset=["LAT", "LON"])
         df = df[(df["LAT"] != 0) & (df["LON"] != 0)]
@@ -104,8 +152,96 @@ class AISPortVisitProcessor:
 
         return self.assign_port_names(first_arrivals)
 
-    def process_zip_in_chunks(self, zip_path, chunksize=100_000) -> pd.DataFrame:
+    def extract_vessel_attributes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Latest static attributes per MMSI in a raw AIS chunk, with the ping time as Last_Seen."""
+        df = self.filter_vessel_types(df)
+        df["Last_Seen"] = pd.to_datetime(df["BaseDateTime"], errors='coerce')
+        static_cols = [col for col in self.VESSEL_STATIC_COLS if col in df.columns]
+        return (
+            df.dropna(subset=["Last_Seen"])
+              .sort_values("Last_Seen", kind="stable")
+              .drop_duplicates("MMSI", keep="last")
+              [["MMSI"] + static_cols + ["Last_Seen"]]
+        )
+
+    def update_vessel_dimension(self, updates: pd.DataFrame) -> None:
+        """
+        Merge per-vessel attribute updates into self.vessels.
+        Known vessels keep their Vessel_ID and take the most recent attributes;
+        new vessels get the next dense integer IDs.
+        A stored row with the same or a newer Last_Seen is kept over the update.
+        """
+        if updates.empty:
+            return
+        updates = updates.assign(From_Update=True)
+        if self.vessels.empty:
+            combined = updates
+        else:
+            # Updates first, so the stored row wins ties on Last_Seen
+            combined = pd.concat([updates, self.vessels.assign(From_Update=False)], ignore_index=True)
+        combined["Last_Seen"] = pd.to_datetime(combined["Last_Seen"])
+        latest = (
+            combined.sort_values("Last_Seen", kind="stable")
+                    .drop_duplicates("MMSI", keep="last")
+                    .sort_values("MMSI")
+        )
+
+        known_ids = self.vessels.set_index("MMSI")["Vessel_ID"]
+        ids = latest["MMSI"].map(known_ids).astype("Int64")
+        new = ids.isna()
+        if new.any():
+            next_id = int(known_ids.max()) + 1 if len(known_ids) else 0
+            ids[new] = np.arange(next_id, next_id + int(new.sum()))
+        latest["Vessel_ID"] = ids.astype("int32")
+
+        # Only vessels whose kept row came from this update changed (new vessels always do)
+        changed = latest.loc[latest["From_Update"].astype(bool), "MMSI"]
+        self._updated_mmsi.update(changed.tolist())
+        self.vessels = (
+            latest.reindex(columns=self.VESSEL_DIM_COLS)
+                  .sort_values("Vessel_ID")
+                  .reset_index(drop=True)
+        )
+
+    def load_vessel_dimension(self, vessels: pd.DataFrame) -> None:
+        """Start from a previously saved vessel dimension so Vessel_IDs stay stable across runs."""
+        self.vessels = vessels.reindex(columns=self.VESSEL_DIM_COLS).reset_index(drop=True)
+        self._updated_mmsi = set()
+
+    def pop_vessel_updates(self) -> pd.DataFrame:
+        """Return the dimension rows added or changed since the last call."""
+        updated = self.vessels[self.vessels["MMSI"].isin(self._updated_mmsi)]
+        self._updated_mmsi = set()
+        return updated.reset_index(drop=True)
+
+    def to_visit_facts(self, visits: pd.DataFrame) -> pd.DataFrame:
+        """Replace MMSI and static vessel fields on visits with the dense Vessel_ID."""
+        if visits.empty:
+            return visits
+        ids = self.vessels.set_index("MMSI")["Vessel_ID"]
+        facts = visits.drop(columns=[col for col in self.VESSEL_STATIC_COLS if col in visits.columns])
+        facts.insert(0, "Vessel_ID", facts["MMSI"].map(ids).astype("Int32"))
+        return facts.drop(columns=["MMSI"])
+
+    def with_vessel_attributes(self, facts: pd.DataFrame) -> pd.DataFrame:
+        """Join the vessel dimension back onto visit facts by Vessel_ID."""
+        return facts.join(self.vessels.set_index("Vessel_ID"), on="Vessel_ID")
+
+    def vessel_ids(self, vessel_types=None, min_length=None) -> pd.Index:
+        """Vessel_IDs matching a fleet-level filter, for use with facts["Vessel_ID"].isin(...)."""
+        mask = pd.Series(True, index=self.vessels.index)
+        if vessel_types is not None:
+            mask &= self.vessels["VesselType"].isin(vessel_types)
+        if min_length is not None:
+            mask &= self.vessels["Length"] >= min_length
+        return pd.Index(self.vessels.loc[mask, "Vessel_ID"])
+
+    def process_zip_in_chunks(self, zip_path, chunksize=100_000, executor=None) -> pd.DataFrame:
+        if self.parse_workers > 1:
+            return self.process_zip_parallel(zip_path, chunksize, self.parse_workers, executor)
+
         all_cleaned_chunks = []
+        vessel_chunks = []
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             csv_files = [name for name in zip_ref.namelist() if name.endswith('.csv')]
             if not csv_files:
@@ -116,6 +252,93 @@ class AISPortVisitProcessor:
                 for chunk in reader:
                     cleaned = self.extract_first_arrivals_anywhere(chunk)
                     all_cleaned_chunks.append(cleaned)
+                    if self.compact_visits:
+                        vessel_chunks.append(self.extract_vessel_attributes(chunk))
+
+        # One dimension update per daily file
+        if self.compact_visits and vessel_chunks:
+            self.update_vessel_dimension(pd.concat(vessel_chunks, ignore_index=True))
+
+        if all_cleaned_chunks:
+            return pd.concat(all_cleaned_chunks, ignore_index=True)
+        return pd.DataFrame()
+
+    @staticmethod
+    def split_csv_chunks(csv_path, chunksize=100_000, block_size=64 * 1024 * 1024):
+        """
+        Split a CSV into newline-aligned byte ranges of chunksize data rows each,
+        matching the chunks pd.read_csv(chunksize=chunksize) would yield.
+        Assumes no quoted field contains a newline.
+        Returns (header bytes, list of (start, end) byte ranges).
+        """
+        size = os.path.getsize(csv_path)
+        if size == 0:
+            return b"", []
+
+        # boundaries[i] = first byte of chunk i; newline #0 ends the header
+        boundaries = []
+        next_needed = 0
+        seen = 0
+        with open(csv_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in range(0, size, block_size):
+                block = np.frombuffer(mm[offset:offset + block_size], dtype=np.uint8)
+                newlines = np.flatnonzero(block == ord("\n"))
+                while next_needed < seen + len(newlines):
+                    boundaries.append(offset + int(newlines[next_needed - seen]) + 1)
+                    next_needed += chunksize
+                seen += len(newlines)
+            if not boundaries:
+                return mm[:size], []
+            header = mm[:boundaries[0]]
+
+        ends = boundaries[1:] + [size]
+        ranges = [(start, end) for start, end in zip(boundaries, ends) if start < end]
+        return header, ranges
+
+    def parse_pool(self, workers=None) -> ProcessPoolExecutor:
+        """Process pool for process_zip_parallel. Reuse one across ZIPs so workers start once."""
+        # spawn, not fork: this may run in a worker thread next to other pipeline threads
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def process_zip_parallel(self, zip_path, chunksize=100_000, workers=None, executor=None) -> pd.DataFrame:
+        """
+        Parse one daily AIS ZIP with several processes.
+        The CSV member is extracted once to a temp file next to the ZIP, split into
+        newline-aligned ranges of chunksize rows, and each range is filtered in a worker.
+        Results are concatenated in file order, so the output is identical to the
+        serial reader in process_zip_in_chunks.
+        executor: pool from parse_pool to reuse; a new one is started for this ZIP if None.
+        """
+        if executor is None:
+            with self.parse_pool(workers) as executor:
+                return self.process_zip_parallel(zip_path, chunksize, workers, executor)
+
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            csv_files = [name for name in zip_ref.namelist() if name.endswith('.csv')]
+            if not csv_files:
+                return pd.DataFrame()
+
+            fd, csv_path = tempfile.mkstemp(suffix=".csv", dir=os.path.dirname(zip_path) or None)
+            with os.fdopen(fd, "wb") as out, zip_ref.open(csv_files[0]) as f:
+                shutil.copyfileobj(f, out, length=16 * 1024 * 1024)
+
+        try:
+            header, ranges = self.split_csv_chunks(csv_path, chunksize)
+            if not ranges:
+                return pd.DataFrame()
+            # Plain instance carrying only the port and dimension settings, safe to pickle to workers
+            worker_processor = AISPortVisitProcessor(buffer_degrees=self.buffer, compact_visits=self.compact_visits)
+            results = list(executor.map(
+                _parse_csv_range,
+                repeat(worker_processor), repeat(csv_path), repeat(header),
+                ranges, repeat(chunksize)
+            ))
+        finally:
+            os.remove(csv_path)
+
+        all_cleaned_chunks = [visits for visits, _ in results]
+        if self.compact_visits:
+            self.update_vessel_dimension(pd.concat([vessels for _, vessels in results], ignore_index=True))
 
         if all_cleaned_chunks:
             return pd.concat(all_cleaned_chunks, ignore_index=True)
@@ -128,7 +351,12 @@ class AISPortVisitProcessor:
             for f in os.listdir(folder_path)
             if f.endswith('.zip')
         ])
-        visits_list = [self.process_zip_in_chunks(zp) for zp in zip_files]
+        if self.parse_workers > 1 and zip_files:
+            # One pool for every daily ZIP, so workers import pandas once per run
+            with self.parse_pool(self.parse_workers) as executor:
+                visits_list = [self.process_zip_in_chunks(zp, executor=executor) for zp in zip_files]
+        else:
+            visits_list = [self.process_zip_in_chunks(zp) for zp in zip_files]
         visits_list = [df for df in visits_list if not df.empty]
         if visits_list:
             df = pd.concat(visits_list, ignore_index=True)
@@ -204,4 +432,6 @@ class AISPortVisitProcessor:
             return pd.DataFrame()
 
         print(f"Total unique visits found: {len(agg_cleaned_visits)}")
+        if self.compact_visits:
+            return self.to_visit_facts(agg_cleaned_visits)
         return agg_cleaned_visits
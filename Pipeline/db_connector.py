@@ -30,4 +30,174 @@ class Database:
         data = pd.read_sql_table(table_name, con=engine)
         engine.dispose()
         return data
-        
+
+    def table_exists(self, table_name):
+        from sqlalchemy import create_engine, inspect
+
+        engine = create_engine(
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
+        )
+        exists = inspect(engine).has_table(table_name)
+        engine.dispose()
+        return exists
+
+    def fetch_latest_dates(self, table_name, key_col, date_col, since=None, until=None):
+        """
+        Return {key: latest date} for every key stored in table_name.
+        since/until optionally restrict the dates considered to [since, until).
+        Returns an empty dict if the table does not exist yet.
+        """
+        from sqlalchemy import create_engine, text
+        import pandas as pd
+
+        if not self.table_exists(table_name):
+            return {}
+
+        conditions, params = [], {}
+        if since is not None:
+            conditions.append(f'"{date_col}" >= :since')
+            params["since"] = pd.Timestamp(since).to_pydatetime()
+        if until is not None:
+            conditions.append(f'"{date_col}" < :until')
+            params["until"] = pd.Timestamp(until).to_pydatetime()
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+        engine = create_engine(
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
+        )
+        query = text(
+            f'SELECT "{key_col}", MAX("{date_col}") AS "{date_col}" '
+            f'FROM "{table_name}"{where} GROUP BY "{key_col}"'
+        )
+        data = pd.read_sql_query(query, con=engine, params=params, parse_dates=[date_col])
+        engine.dispose()
+        return dict(zip(data[key_col], data[date_col]))
+
+    def upsert_to_postgres(self, data, table_name, key_cols, replace=False):
+        """
+        Insert rows into table_name, overwriting existing rows with the same key_cols.
+        The table and its unique index on key_cols are created on first use.
+        With replace=True the table is dropped and recreated from data's columns first.
+        """
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.dialects.postgresql import insert
+
+        if data.empty and not replace:
+            return
+
+        engine = create_engine(
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
+        )
+        quoted_keys = ", ".join(f'"{col}"' for col in key_cols)
+        with engine.begin() as conn:
+            data.head(0).to_sql(
+                name=table_name,
+                con=conn,
+                if_exists='replace' if replace else 'append',
+                index=False
+            )
+            conn.execute(text(
+                f'CREATE UNIQUE INDEX IF NOT EXISTS "{table_name}_upsert_key" '
+                f'ON "{table_name}" ({quoted_keys})'
+            ))
+
+        def on_conflict_update(table, conn, keys, data_iter):
+            rows = [dict(zip(keys, row)) for row in data_iter]
+            stmt = insert(table.table).values(rows)
+            update_cols = {c: stmt.excluded[c] for c in keys if c not in key_cols}
+            if update_cols:
+                stmt = stmt.on_conflict_do_update(index_elements=key_cols, set_=update_cols)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=key_cols)
+            conn.execute(stmt)
+
+        data.to_sql(
+                name=table_name,
+                con=engine,
+                if_exists='append',
+                index=False,
+                method=on_conflict_update,
+                chunksize=10_000
+            )
+        engine.dispose()
+
+    def fetch_rows_since(self, table_name, date_col, since=None, key_col=None, keys=None):
+        """
+        Fetch rows of table_name whose date_col is on or after since.
+        No date filter when since is None. When key_col and keys are given,
+        only rows whose key_col is in keys are fetched.
+        """
+        from sqlalchemy import bindparam, create_engine, text
+        import pandas as pd
+
+        conditions, params = [], {}
+        if since is not None:
+            conditions.append(f'"{date_col}" >= :since')
+            params["since"] = pd.Timestamp(since).to_pydatetime()
+        if key_col is not None and keys is not None:
+            if len(keys) == 0:
+                return pd.DataFrame()
+            conditions.append(f'"{key_col}" IN :keys')
+            params["keys"] = list(keys)
+        if not conditions:
+            return self.fetch_from_postgres(table_name)
+
+        engine = create_engine(
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
+        )
+        query = text(f'SELECT * FROM "{table_name}" WHERE ' + " AND ".join(conditions))
+        if "keys" in params:
+            query = query.bindparams(bindparam("keys", expanding=True))
+        data = pd.read_sql_query(query, con=engine, params=params)
+        engine.dispose()
+        return data
+
+    def fetch_latest_rows(self, table_name, key_col, date_col):
+        """Fetch the row with the latest date_col for every key in table_name."""
+        from sqlalchemy import create_engine, text
+        import pandas as pd
+
+        engine = create_engine(
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
+        )
+        query = text(
+            f'SELECT t.* FROM "{table_name}" t '
+            f'JOIN (SELECT "{key_col}", MAX("{date_col}") AS latest FROM "{table_name}" GROUP BY "{key_col}") m '
+            f'ON t."{key_col}" = m."{key_col}" AND t."{date_col}" = m.latest'
+        )
+        data = pd.read_sql_query(query, con=engine)
+        engine.dispose()
+        return data
+
+    def fetch_columns(self, table_name):
+        """Return the column names of table_name, in table order."""
+        from sqlalchemy import create_engine, inspect
+
+        engine = create_engine(
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
+        )
+        columns = [col["name"] for col in inspect(engine).get_columns(table_name)]
+        engine.dispose()
+        return columns
+
+    def fetch_table_version(self, table_name, date_col=None):
+        """
+        Return a cheap version key for table_name: its row count, the newest row
+        version (MAX(xmin), which changes on every insert and in-place update, e.g.
+        upserts), plus MAX(date_col) if given.
+        """
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine(
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
+        )
+        max_expr = f', MAX("{date_col}")' if date_col else ''
+        with engine.connect() as conn:
+            row = conn.execute(text(
+                f'SELECT COUNT(*), MAX(xmin::text::bigint){max_expr} FROM "{table_name}"'
+            )).one()
+        engine.dispose()
+        version = {"rows": int(row[0]), "max_xmin": str(row[1])}
+        if date_col:
+            version["max_" + date_col] = str(row[2])
+        return version
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+
+
+class PortLagAnalyzer:
+    """
+    Lagged correlation and regression of per-port vessel counts against an index price.
+    Builds the aligned (Period x Port) count matrix and price vector once, then computes
+    every port x lag x window combination in a single NumPy pass. Results are cached.
+    Periods are only those with both AIS data and prices, so a lag of k shifts by k rows
+    of that table, like shift(k) on the notebook's monthly summary.
+    """
+
+    TOTAL_PORT = "All Ports"
+
+    def __init__(self, port_visits: pd.DataFrame, macro_prices: pd.DataFrame,
+                 price_col: str = "^GSPC_Close", freq: str = "M"):
+        """
+        port_visits: ais_port_visits rows (BaseDateTime, Port_Name, ...)
+        macro_prices: macro_prices rows (Date, price_col)
+        freq: "D" for trading days or "M" for months with data (counts summed, prices averaged)
+        """
+        self.price_col = price_col
+        self.freq = freq
+        self.counts, self.prices = self.__align(port_visits, macro_prices)
+        self.ports = self.counts.columns.tolist()
+        self.periods = self.counts.index
+        self._cache = {}
+
+    def __align(self, port_visits: pd.DataFrame, macro_prices: pd.DataFrame):
+        """Return (Period x Port counts, price Series) on the same index."""
+        visits = pd.DataFrame({
+            "Date": pd.to_datetime(port_visits["BaseDateTime"]).dt.normalize(),
+            "Port_Name": port_visits["Port_Name"],
+        })
+        daily_counts = visits.groupby(["Date", "Port_Name"]).size().unstack(fill_value=0)
+        daily_counts[self.TOTAL_PORT] = daily_counts.sum(axis=1)
+
+        prices = macro_prices[["Date", self.price_col]].copy()
+        prices["Date"] = pd.to_datetime(prices["Date"]).dt.normalize()
+        daily_prices = prices.groupby("Date")[self.price_col].mean()
+
+        # Keep trading days that have AIS data, like the inner merge in the notebook
+        dates = daily_counts.index.intersection(daily_prices.index)
+        counts = daily_counts.loc[dates].astype("float64")
+        price = daily_prices.loc[dates]
+
+        if self.freq == "M":
+            # Group only the months that have data, calendar gaps between windows are not filled
+            months = dates.to_period("M").to_timestamp()
+            counts = counts.groupby(months).sum()
+            price = price.groupby(months).mean()
+        elif self.freq != "D":
+            raise ValueError("freq must be 'D' or 'M'")
+        counts.index.name = "Period"
+        price.index.name = "Period"
+        return counts, price
+
+    def monthly_summary(self) -> pd.DataFrame:
+        """Monthly total vessel count and average price, as in prepare_monthly_summary."""
+        summary = pd.DataFrame({
+            "Vessel_Count": self.counts[self.TOTAL_PORT],
+            self.price_col: self.prices,
+        })
+        if self.freq == "D":
+            months = summary.index.to_period("M").to_timestamp()
+            summary = summary.groupby(months).agg({"Vessel_Count": "sum", self.price_col: "mean"})
+        return summary.rename_axis("Month").reset_index()
+
+    def __lagged_arrays(self, lags):
+        """
+        Return (x, v, y) where x[t, l*P + p] is the count of port p at t - lags[l],
+        y[t] is the price at t, and v marks the pairs where both are known.
+        Both series are centred on their overall means for numerical stability.
+        """
+        counts = self.counts.to_numpy()
+        price = self.prices.to_numpy()
+        n_periods, n_ports = counts.shape
+        counts = counts - np.nanmean(counts, axis=0)
+        price = price - np.nanmean(price)
+
+        x = np.full((n_periods, len(lags), n_ports), np.nan)
+        for i, lag in enumerate(lags):
+            if lag < n_periods:
+                x[lag:, i, :] = counts[:n_periods - lag]
+        x = x.reshape(n_periods, len(lags) * n_ports)
+        v = ~np.isnan(x) & ~np.isnan(price)[:, None]
+        return np.where(v, x, 0.0), v.astype("float64"), np.where(np.isnan(price), 0.0, price)
+
+    @staticmethod
+    def __pearson(n, sx, sy, sxx, syy, sxy):
+        """Correlation and slope from summed moments (arrays of equal shape)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxy - sx * sy
+            var_x = n * sxx - sx ** 2
+            var_y = n * syy - sy ** 2
+            corr = cov / np.sqrt(var_x * var_y)
+            slope = cov / var_x
+        corr[n < 3] = np.nan
+        slope[n < 3] = np.nan
+        return corr, slope
+
+    @staticmethod
+    def __period_moments(x, v, y):
+        """Per-period terms of the six Pearson moment sums, each (periods x lags*ports)."""
+        return (v, x, v * y[:, None], x * x, v * (y ** 2)[:, None], x * y[:, None])
+
+    def correlations(self, lags=range(1, 7), windows=None) -> pd.DataFrame:
+        """
+        Correlation of each port's lagged count with the price, for every lag and window.
+        lags: periods the counts lead the price by
+        windows: list of (start, end) date strings on the price Period; None = full history
+        Returns a long DataFrame (Window, Port, Lag, Correlation, Slope, N).
+        """
+        lags = tuple(int(lag) for lag in lags)
+        windows = tuple(windows) if windows is not None else (("", ""),)
+        key = ("correlations", lags, windows)
+        if key not in self._cache:
+            self._cache[key] = self.__correlations(lags, windows)
+        return self._cache[key].copy()
+
+    def __correlations(self, lags, windows):
+        x, v, y = self.__lagged_arrays(lags)
+        periods = self.periods
+        masks = np.empty((len(windows), len(periods)))
+        for i, (start, end) in enumerate(windows):
+            mask = np.ones(len(periods), dtype=bool)
+            if start:
+                mask &= periods >= pd.Timestamp(start)
+            if end:
+                mask &= periods <= pd.Timestamp(end)
+            masks[i] = mask
+
+        n, sx, sy, sxx, syy, sxy = [masks @ m for m in self.__period_moments(x, v, y)]
+        corr, slope = self.__pearson(n, sx, sy, sxx, syy, sxy)
+
+        n_ports = len(self.ports)
+        window_labels = [f"{start or 'start'} to {end or 'end'}" for start, end in windows]
+        index = pd.MultiIndex.from_product(
+            [window_labels, lags, self.ports], names=["Window", "Lag", "Port"]
+        )
+        shape = len(windows) * len(lags) * n_ports
+        result = pd.DataFrame({
+            "Correlation": corr.reshape(shape),
+            "Slope": slope.reshape(shape),
+            "N": n.reshape(shape).astype("int64"),
+        }, index=index)
+        return result.reset_index()[["Window", "Port", "Lag", "Correlation", "Slope", "N"]]
+
+    def rolling_correlations(self, window: int, lags=range(1, 7)) -> pd.DataFrame:
+        """
+        Rolling correlation over the last `window` periods for every port and lag,
+        computed from cumulative moment sums.
+        Returns a long DataFrame (Period, Port, Lag, Correlation, Slope, N) indexed by window end.
+        """
+        lags = tuple(int(lag) for lag in lags)
+        key = ("rolling", lags, int(window))
+        if key not in self._cache:
+            self._cache[key] = self.__rolling_correlations(int(window), lags)
+        return self._cache[key].copy()
+
+    def __rolling_correlations(self, window, lags):
+        x, v, y = self.__lagged_arrays(lags)
+        n_periods = len(self.periods)
+        if window > n_periods:
+            return pd.DataFrame(columns=["Period", "Port", "Lag", "Correlation", "Slope", "N"])
+
+        # Window sums as differences of cumulative sums along the period axis
+        moments = []
+        for m in self.__period_moments(x, v, y):
+            csum = np.vstack([np.zeros((1, m.shape[1])), np.cumsum(m, axis=0)])
+            moments.append(csum[window:] - csum[:-window])
+        corr, slope = self.__pearson(*moments)
+        n = moments[0]
+
+        ends = self.periods[window - 1:]
+        n_ports = len(self.ports)
+        index = pd.MultiIndex.from_product(
+            [ends, lags, self.ports], names=["Period", "Lag", "Port"]
+        )
+        shape = len(ends) * len(lags) * n_ports
+        result = pd.DataFrame({
+            "Correlation": corr.reshape(shape),
+            "Slope": slope.reshape(shape),
+            "N": np.rint(n).reshape(shape).astype("int64"),
+        }, index=index)
+        return result.reset_index()[["Period", "Port", "Lag", "Correlation", "Slope", "N"]]
+
+    def best_lags(self, lags=range(1, 7), windows=None) -> pd.DataFrame:
+        """Lag with the strongest absolute correlation per window and port."""
+        corr = self.correlations(lags, windows).dropna(subset=["Correlation"])
+        strongest = corr["Correlation"].abs().groupby([corr["Window"], corr["Port"]]).idxmax()
+        return corr.loc[strongest.values].reset_index(drop=True)
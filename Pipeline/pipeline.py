@@ -3,64 +3,221 @@ from Pipeline.yfinance_fetcher import YFinanceFetcher
 from Pipeline.AIS_processor import AISPortVisitProcessor
 from Pipeline.yfinance_cleaner import YFinanceCleaner
 import os
+import json
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 class Pipeline:
+    # Column used with the row count and row version to tell whether a snapshotted table changed
+    SNAPSHOT_VERSION_COLS = {
+        "ais_port_visits": "BaseDateTime",
+        "ais_port_financial_data_db": "Period",
+        "macro_prices": "Date",
+    }
+
     def __init__(self, db_config):
         self.db = Database(**db_config)
 
-    def fetch_and_save_yfinance_data(self, start_date, end_date, replace):
+    def __run_concurrently(self, tasks, max_workers):
+        """
+        Run each callable in tasks ({name: callable}) in its own thread.
+        Returns {name: exception or None} so every branch's failure is reported on its own.
+        """
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(task): name for name, task in tasks.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                errors[name] = future.exception()
+                if errors[name] is not None:
+                    print(f"Error in {name}: {errors[name]}")
+        return errors
+
+    def fetch_and_save_yfinance_data(self, start_date, end_date, replace, max_workers=4, long_prices=False):
         """
         1) Fetch S&P 500 info and save to PostgreSQL
         2) Fetch S&P 500 index prices and save to PostgreSQL
         3) Fetch all S&P 500 tickers’ prices and save only the “Close” columns
+           (with long_prices=True, append them to sp500_prices_long via update_sp500_prices)
         4) Fetch all S&P 500 financial statements and save to PostgreSQL
+        Info, prices (steps 2-3) and statements are fetched and written concurrently
+        with up to max_workers threads.
         """
         data_fetcher = YFinanceFetcher(start_date, end_date)
 
         try:
-            # 1. Fetch S&P 500 info
+            # Tickers are needed by steps 3 and 4, so fetch the info table once up front
             sp500_info_df = data_fetcher.get_sp500_info()
+            sp500_tickers = sp500_info_df["Symbol"].tolist()
+        except Exception as e:
+            print(f"Error fetching S&P 500 info: {e}")
+            raise e
+
+        # 1. Save S&P 500 info
+        def save_info():
             self.db.save_to_postgres(sp500_info_df, "sp500_info", replace=True)
             print("S&P 500 info data saved successfully to PostgreSQL")
 
-            # 2. Fetch S&P 500 index prices
+        # 2-3. Fetch S&P 500 index and tickers’ prices in one task:
+        # yf.download keeps module-level state, so two downloads must never overlap
+        def save_prices():
             sp500_index_df = data_fetcher.get_ticker_price("^GSPC", start_date, end_date)
             print(f"Fetched S&P 500 index data from {start_date} to {end_date}")
             self.db.save_to_postgres(sp500_index_df, "macro_prices", replace)
             print("Macroeconomic data saved successfully to PostgreSQL")
 
-            # 3. Fetch all S&P 500 tickers’ prices
-            sp500_tickers = data_fetcher.get_sp500_tickers()
+            if long_prices:
+                self.update_sp500_prices(start_date, end_date, sp500_tickers=sp500_tickers)
+                return
+
             sp500_prices_df = data_fetcher.get_ticker_price(sp500_tickers, start_date, end_date)
             print(sp500_prices_df.head())
 
-           
             close_cols = [f"{ticker}_Close" for ticker in sp500_tickers]
             to_save = sp500_prices_df[["Date"] + close_cols]
             self.db.save_to_postgres(to_save, "sp500_prices", replace)
             print("S&P 500 prices (Close only) saved successfully to PostgreSQL")
-            
 
-            # 4. Fetch S&P 500 financial statements
+        # 4. Fetch S&P 500 financial statements
+        def save_statements():
             income_df, balance_df, cashflow_df = data_fetcher.get_sp500_statements(sp500_tickers)
             self.db.save_to_postgres(income_df, "sp500_income_statements", replace)
             self.db.save_to_postgres(balance_df, "sp500_balance_sheets", replace)
             self.db.save_to_postgres(cashflow_df, "sp500_cashflow_statements", replace)
             print("S&P 500 financial statements data saved successfully to PostgreSQL")
 
-        except Exception as e:
-            print(f"Error saving YFinance data to PostgreSQL: {e}")
-            raise e
-    
-    def fetch_and_save_ais_data(self, start_date, end_date, save_folder, output_csv_path, replace):
+        errors = self.__run_concurrently({
+            "sp500_info": save_info,
+            "prices": save_prices,
+            "sp500_statements": save_statements,
+        }, max_workers)
+        failed = {name: e for name, e in errors.items() if e is not None}
+        if failed:
+            print(f"Error saving YFinance data to PostgreSQL: {', '.join(failed)} failed")
+            raise next(iter(failed.values()))
+
+    def update_sp500_prices(self, start_date, end_date, batch_size=100, table_name="sp500_prices_long",
+                            sp500_tickers=None):
+        """
+        Incrementally store daily S&P 500 Close prices in long form (Ticker, Date, Close).
+        For each ticker only the part of [start_date, end_date) that is missing is written:
+        - dates after its latest stored Date (disjoint windows stay disjoint, the gap is not stored)
+        - the whole window when it lies before the latest stored Date and none of it is stored yet
+        Tickers sharing a download range are fetched together in batches of batch_size and
+        upserted on (Ticker, Date).
+        Close is adjusted as of the fetch date, so every download of a stored ticker reaches back
+        to its latest stored Date. If that bar's Close no longer matches the stored one, a dividend
+        or split changed the basis and the ticker's stored dates are refetched too.
+        """
+        data_fetcher = YFinanceFetcher(start_date, end_date)
+        if sp500_tickers is None:
+            sp500_tickers = data_fetcher.get_sp500_tickers()
+        start_dt = pd.to_datetime(start_date)
+        end_dt = pd.to_datetime(end_date)
+
+        if self.db.table_exists(table_name):
+            latest = self.db.fetch_latest_rows(table_name, "Ticker", "Date")
+            latest["Date"] = pd.to_datetime(latest["Date"]).dt.normalize()
+            latest = latest.set_index("Ticker")
+            # Tickers with any stored row inside the requested window
+            in_window = self.db.fetch_latest_dates(table_name, "Ticker", "Date", start_dt, end_dt)
+        else:
+            latest = pd.DataFrame(columns=["Date", "Close"])
+            in_window = {}
+        print(f"Found stored prices for {len(latest)} tickers in {table_name}")
+
+        # Group tickers by the range they need to download, yfinance treats end as exclusive
+        tickers_by_range = {}
+        for ticker in sp500_tickers:
+            if ticker not in latest.index:
+                fetch_range = (start_dt, end_dt)
+            else:
+                latest_dt = latest.at[ticker, "Date"]
+                backfill = start_dt <= latest_dt and ticker not in in_window
+                if not backfill and end_dt <= latest_dt + timedelta(days=1):
+                    continue
+                fetch_start = start_dt if backfill else latest_dt
+                fetch_range = (fetch_start, max(end_dt, latest_dt + timedelta(days=1)))
+            tickers_by_range.setdefault(fetch_range, []).append(ticker)
+
+        if not tickers_by_range:
+            print(f"{table_name} is already up to date from {start_date} through {end_date}")
+            return
+
+        adjusted = []
+        for (fetch_start, fetch_end), tickers in sorted(tickers_by_range.items()):
+            fetch_start, fetch_end = fetch_start.strftime("%Y-%m-%d"), fetch_end.strftime("%Y-%m-%d")
+            print(f"==> Prices: Fetching {len(tickers)} tickers from {fetch_start} to {fetch_end}")
+            prices_df = data_fetcher.get_ticker_price_long(tickers, fetch_start, fetch_end, batch_size)
+            prices_df["Date"] = pd.to_datetime(prices_df["Date"]).dt.normalize()
+
+            # Compare each stored ticker's latest stored bar with the freshly adjusted one
+            stored = prices_df["Ticker"].isin(latest.index)
+            latest_dates = prices_df["Ticker"].map(latest["Date"])
+            reference = prices_df[stored & (prices_df["Date"] == latest_dates)]
+            same_basis = np.isclose(reference["Close"].to_numpy(dtype=float),
+                                    reference["Ticker"].map(latest["Close"]).to_numpy(dtype=float),
+                                    rtol=1e-6)
+            fetched = set(prices_df.loc[stored, "Ticker"])
+            adjusted += sorted(fetched - set(reference.loc[same_basis, "Ticker"]))
+
+            # Keep only the requested window, minus the reference bar that is already stored
+            in_range = (prices_df["Date"] >= start_dt) & (prices_df["Date"] < end_dt)
+            prices_df = prices_df[in_range & (prices_df["Date"] != latest_dates)]
+            try:
+                self.db.upsert_to_postgres(prices_df, table_name, ["Ticker", "Date"])
+                print(f"Upserted {len(prices_df)} price rows into {table_name}")
+            except Exception as e:
+                print(f"Error upserting prices from {fetch_start} to PostgreSQL: {e}")
+                raise e
+
+        if adjusted:
+            self.__refetch_adjusted_prices(data_fetcher, adjusted, batch_size, table_name)
+
+    def __refetch_adjusted_prices(self, data_fetcher, tickers, batch_size, table_name):
+        """
+        Refetch the stored dates of tickers whose adjustment basis changed (dividend or split),
+        so old rows are rewritten on the same basis as the bars just stored.
+        """
+        print(f"==> Prices: Dividend or split for {len(tickers)} tickers, refetching their history")
+        stored = self.db.fetch_rows_since(table_name, "Date", key_col="Ticker", keys=list(tickers))
+        stored["Date"] = pd.to_datetime(stored["Date"]).dt.normalize()
+        stored_keys = pd.MultiIndex.from_frame(stored[["Ticker", "Date"]])
+        fetch_end = (stored["Date"].max() + timedelta(days=1)).strftime("%Y-%m-%d")
+
+        tickers_by_start = {}
+        for ticker, first_date in stored.groupby("Ticker")["Date"].min().items():
+            tickers_by_start.setdefault(first_date.strftime("%Y-%m-%d"), []).append(ticker)
+
+        for ticker_start, group in sorted(tickers_by_start.items()):
+            prices_df = data_fetcher.get_ticker_price_long(group, ticker_start, fetch_end, batch_size)
+            prices_df["Date"] = pd.to_datetime(prices_df["Date"]).dt.normalize()
+            # Only rewrite dates already stored, without filling gaps between windows
+            keys = pd.MultiIndex.from_frame(prices_df[["Ticker", "Date"]])
+            prices_df = prices_df[keys.isin(stored_keys)]
+            self.db.upsert_to_postgres(prices_df, table_name, ["Ticker", "Date"])
+            print(f"Rewrote {len(prices_df)} adjusted price rows for {len(group)} tickers in {table_name}")
+
+    def fetch_and_save_ais_data(self, start_date, end_date, save_folder, output_csv_path, replace, parse_workers=1,
+                                compact_visits=False, vessel_table="ais_vessels"):
         """
         Download AIS data in weekly chunks (year by year), process each chunk into a single CSV,
         then write each weekly chunk to Postgres (with replace only on the first chunk).
         Finally, delete all downloaded ZIPs.
+        parse_workers: processes used to parse each daily CSV
+        compact_visits: save visits keyed by Vessel_ID, without the static vessel fields,
+            to their own table ais_port_visit_facts; ais_port_visits keeps the MMSI schema
+        vessel_table: vessel dimension (MMSI -> Vessel_ID + latest static fields), only
+            loaded and upserted on MMSI after every week when compact_visits is set
         """
-        processor = AISPortVisitProcessor()
+        processor = AISPortVisitProcessor(parse_workers=parse_workers, compact_visits=compact_visits)
+        # Facts have a different schema, so appending them to ais_port_visits would fail every week
+        visits_table = "ais_port_visit_facts" if compact_visits else "ais_port_visits"
+        if compact_visits and self.db.table_exists(vessel_table):
+            # Reuse stored Vessel_IDs so they stay stable across runs
+            processor.load_vessel_dimension(self.load_data(vessel_table))
         # Ensure directories exist
         os.makedirs(save_folder, exist_ok=True)
         os.makedirs(os.path.dirname(output_csv_path), exist_ok=True)
@@ -101,12 +258,20 @@ class Pipeline:
 
                 try:
                     save_replace = replace if first_chunk else False
-                    print(f"==> AIS: Saving data for {week_start_str} to PostgreSQL (replace={save_replace})")
-                    self.db.save_to_postgres(week_df, "ais_port_visits", save_replace)
+                    print(f"==> AIS: Saving data for {week_start_str} to {visits_table} (replace={save_replace})")
+                    self.db.save_to_postgres(week_df, visits_table, save_replace)
                     first_chunk = False
                 except Exception as e:
                     print(f"Error saving AIS data for {week_start_str} to PostgreSQL: {e}")
 
+                if compact_visits:
+                    try:
+                        vessel_updates = processor.pop_vessel_updates()
+                        self.db.upsert_to_postgres(vessel_updates, vessel_table, ["MMSI"])
+                        print(f"==> AIS: Upserted {len(vessel_updates)} vessels into {vessel_table}")
+                    except Exception as e:
+                        print(f"Error saving vessel dimension for {week_start_str} to PostgreSQL: {e}")
+
         processor.delete_zips(save_folder)
         print("All AIS ZIPs deleted.")
 
@@ -116,45 +281,143 @@ class Pipeline:
         print(f"Data loaded successfully from {table_name} (records: {len(data) if hasattr(data, 'shape') else 'unknown'})")
         return data
 
-    def fetch_and_save_locally(self, start_date, end_date, save_folder):
+    def load_snapshot(self, table_name, snapshot_dir="snapshots", check_remote=True):
+        """
+        Load table_name from a local Feather (Arrow IPC) snapshot.
+        The file is opened memory-mapped and converted block by block, so numeric columns
+        without nulls can stay views of the mapped file; other columns are copied into pandas.
+        The snapshot is refreshed from PostgreSQL only when the table's version key
+        (row count, newest row version and max of SNAPSHOT_VERSION_COLS[table_name])
+        no longer matches.
+        check_remote=False skips the version query and uses any existing snapshot as-is.
+        """
+        import pyarrow.feather as feather
+
+        os.makedirs(snapshot_dir, exist_ok=True)
+        data_path = os.path.join(snapshot_dir, f"{table_name}.feather")
+        version_path = os.path.join(snapshot_dir, f"{table_name}.version.json")
+
+        local_version = None
+        if os.path.exists(data_path) and os.path.exists(version_path):
+            with open(version_path) as f:
+                local_version = json.load(f)
+
+        if local_version is not None and not check_remote:
+            remote_version = local_version
+        else:
+            remote_version = self.db.fetch_table_version(
+                table_name, self.SNAPSHOT_VERSION_COLS.get(table_name)
+            )
+
+        if remote_version != local_version:
+            print(f"Snapshot of {table_name} is stale, refreshing from PostgreSQL")
+            data = self.load_data(table_name)
+            # Uncompressed so the file can be memory-mapped without decoding
+            feather.write_feather(data, data_path, compression="uncompressed")
+            with open(version_path, "w") as f:
+                json.dump(remote_version, f)
+
+        table = feather.read_table(data_path, memory_map=True)
+        # split_blocks avoids consolidating columns into one copied 2D block;
+        # self_destruct releases each Arrow column once it has been converted
+        data = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+        print(f"Loaded {table_name} from snapshot {data_path} (records: {len(data)})")
+        return data
+
+    def load_snapshots(self, table_names=None, snapshot_dir="snapshots", check_remote=True):
+        """Load several tables via load_snapshot. Defaults to the analysis tables."""
+        table_names = table_names or list(self.SNAPSHOT_VERSION_COLS)
+        return {
+            table_name: self.load_snapshot(table_name, snapshot_dir, check_remote)
+            for table_name in table_names
+        }
+
+    def fetch_and_save_concurrently(self, start_date, end_date, save_folder, output_csv_path, replace,
+                                    ais_parse_workers=1, finance_workers=4, long_prices=False):
+        """
+        Run the AIS and YFinance ingestion side by side. They are independent: AIS is
+        CPU and bandwidth heavy on NOAA, YFinance is latency bound on Yahoo.
+        ais_parse_workers: processes used by the AIS branch to parse each daily CSV
+        finance_workers: threads used by the YFinance branch
+        long_prices: passed to fetch_and_save_yfinance_data
+        Returns {"ais": exception or None, "yfinance": exception or None}.
+        """
+        return self.__run_concurrently({
+            "ais": lambda: self.fetch_and_save_ais_data(
+                start_date, end_date, save_folder, output_csv_path, replace, ais_parse_workers
+            ),
+            "yfinance": lambda: self.fetch_and_save_yfinance_data(
+                start_date, end_date, replace, finance_workers, long_prices
+            ),
+        }, max_workers=2)
+
+    def fetch_and_save_locally(self, start_date, end_date, save_folder, concurrent=True,
+                               ais_parse_workers=1, finance_workers=4):
         """
         1) Download & process AIS port visits into a local CSV.
         2) Download and save all YFinance data locally into CSVs under save_folder.
+        With concurrent=True both branches run side by side and the YFinance info,
+        prices and statements are written concurrently with up to finance_workers threads.
+        Returns {"ais": exception or None, "yfinance": exception or None}.
         """
-        processor = AISPortVisitProcessor(buffer_degrees=1)
         # Ensure folder exists
         os.makedirs(save_folder, exist_ok=True)
 
-        # 1. AIS locally
+        branches = {
+            "ais": lambda: self.__save_ais_locally(start_date, end_date, save_folder, ais_parse_workers),
+            "yfinance": lambda: self.__save_yfinance_locally(
+                start_date, end_date, save_folder, finance_workers if concurrent else 1
+            ),
+        }
+        if concurrent:
+            return self.__run_concurrently(branches, max_workers=2)
+
+        errors = {}
+        for name, branch in branches.items():
+            try:
+                branch()
+                errors[name] = None
+            except Exception as e:
+                print(f"Error in {name}: {e}")
+                errors[name] = e
+        return errors
+
+    def __save_ais_locally(self, start_date, end_date, save_folder, parse_workers):
+        """Download & process AIS port visits into save_folder/port_visits.csv."""
+        processor = AISPortVisitProcessor(buffer_degrees=1, parse_workers=parse_workers)
         visits_df = processor.run(start_date, end_date, save_folder, save_folder)
         visits_path = os.path.join(save_folder, "port_visits.csv")
         visits_df.to_csv(visits_path, index=False)
         print(f"Port visits saved to {visits_path} (records: {len(visits_df)})")
         processor.delete_zips(save_folder)
 
-        # 2. YFinance locally
+    def __save_yfinance_locally(self, start_date, end_date, save_folder, max_workers):
+        """Download and save all YFinance data into CSVs under save_folder."""
         data_fetcher = YFinanceFetcher(start_date=start_date, end_date=end_date)
-        try:
-            # S&P 500 info
-            sp500_info_df = data_fetcher.get_sp500_info()
+        # S&P 500 info, also the source of the tickers for the other artifacts
+        sp500_info_df = data_fetcher.get_sp500_info()
+        sp500_tickers = sp500_info_df["Symbol"].tolist()
+
+        def save_info():
             info_path = os.path.join(save_folder, "sp500_info.csv")
             sp500_info_df.to_csv(info_path, index=False)
             print(f"S&P 500 info saved to {info_path}")
 
-            # S&P 500 index prices
+        # S&P 500 index and tickers’ prices, in one task so the yf.download calls never overlap
+        def save_prices():
             macro_prices_df = data_fetcher.get_ticker_price("^GSPC", start_date, end_date)
             macro_path = os.path.join(save_folder, "macro_prices.csv")
             macro_prices_df.to_csv(macro_path, index=False)
             print(f"Macro prices saved to {macro_path}")
 
-            # All S&P 500 tickers’ prices
-            sp500_tickers = data_fetcher.get_sp500_tickers()
             sp500_prices_df = data_fetcher.get_ticker_price(sp500_tickers, start_date, end_date)
             sp500_prices_path = os.path.join(save_folder, "sp500_prices.csv")
             sp500_prices_df.to_csv(sp500_prices_path, index=False)
             print(f"S&P 500 prices saved to {sp500_prices_path}")
 
-            # All S&P 500 financial statements
+        # All S&P 500 financial statements
+        def save_statements():
             income_df, balance_df, cashflow_df = data_fetcher.get_sp500_statements(sp500_tickers)
             income_path = os.path.join(save_folder, "sp500_income_statements.csv")
             balance_path = os.path.join(save_folder, "sp500_balance_sheets.csv")
@@ -164,8 +427,15 @@ class Pipeline:
             cashflow_df.to_csv(cashflow_path, index=False)
             print("All S&P 500 statements saved locally.")
 
-        except Exception as e:
-            print(f"Error saving YFinance data locally: {e}")
+        errors = self.__run_concurrently({
+            "sp500_info": save_info,
+            "prices": save_prices,
+            "sp500_statements": save_statements,
+        }, max_workers)
+        failed = {name: e for name, e in errors.items() if e is not None}
+        if failed:
+            print(f"Error saving YFinance data locally: {', '.join(failed)} failed")
+            raise next(iter(failed.values()))
 
     def __concat_yfinance_data(self, statements, prices, info):
         """
@@ -183,13 +453,18 @@ class Pipeline:
         df = cleaner.run()
         return df
 
-    def load_and_concat_yfinance_data(self):
+    def load_and_concat_yfinance_data(self, prices_table="sp500_prices"):
+        """
+        Load the finance tables and combine them into one daily fundamentals DataFrame.
+        prices_table may be the wide "sp500_prices" table or the long-form
+        "sp500_prices_long" table maintained by update_sp500_prices.
+        """
         # Load data from PostgreSQL
         try:
             income = self.load_data("sp500_income_statements")
             balance = self.load_data("sp500_balance_sheets")
             cashflow = self.load_data("sp500_cashflow_statements")
-            prices = self.load_data("sp500_prices")
+            prices = self.load_data(prices_table)
             info = self.load_data("sp500_info")
             macro_prices = self.load_data("macro_prices")
             print("Data loaded successfully from PostgreSQL")
@@ -203,7 +478,7 @@ class Pipeline:
             statements = [income, balance, cashflow]
             print(macro_prices.head())
             prices_list = [prices, macro_prices]
-            df = pipeline.__concat_yfinance_data(statements, prices_list, info)
+            df = self.__concat_yfinance_data(statements, prices_list, info)
             print("YFinance data concatenated successfully")
             return df
         except Exception as e:
@@ -212,6 +487,118 @@ class Pipeline:
             traceback.print_exc()
             return None
 
+    def __statement_fingerprints(self, statements):
+        """
+        Hash each ticker's raw statement rows so changed or restated statements can be detected.
+        Returns a DataFrame with columns (Ticker, Statements_Hash).
+        """
+        hashes = {}
+        for df in statements:
+            for ticker, rows in df.groupby("Ticker", sort=False):
+                rows = rows.sort_values("Period").reset_index(drop=True)
+                row_hash = int(pd.util.hash_pandas_object(rows, index=False).sum())
+                hashes[ticker] = hashes.get(ticker, "") + f"{row_hash:x}"
+        return pd.DataFrame({"Ticker": list(hashes.keys()), "Statements_Hash": list(hashes.values())})
+
+    def __full_combined_build(self, prices_table, table_name, fingerprints):
+        """Rebuild table_name from scratch and reset its statement fingerprints."""
+        df = self.load_and_concat_yfinance_data(prices_table)
+        if df is None:
+            return
+        self.db.upsert_to_postgres(df, table_name, ["Ticker", "Period"], replace=True)
+        self.db.upsert_to_postgres(fingerprints, f"{table_name}_state", ["Ticker"], replace=True)
+        print(f"Full build saved to {table_name} (records: {len(df)})")
+
+    def update_yfinance_combined_data(self, prices_table="sp500_prices_long",
+                                      table_name="ais_port_financial_data_db"):
+        """
+        Incrementally build the combined daily fundamentals table and upsert it on (Ticker, Period).
+        prices_table must be the long-form (Ticker, Date, Close) table kept by update_sp500_prices.
+        - Tickers whose statements are unchanged are built only from the day after their latest
+          stored Period, seeded with that stored row so forward-filled fundamentals carry over.
+        - Tickers with new or restated statements, or not stored yet, are rebuilt over their
+          full price history. Only those tickers' full price history is read.
+        Statement fingerprints are kept in f"{table_name}_state" between runs.
+        Falls back to a full build when table_name does not exist yet, or when the selected
+        columns no longer match the stored table.
+        """
+        state_table = f"{table_name}_state"
+
+        # Statements, info and macro prices are small, load them whole
+        income = self.load_data("sp500_income_statements")
+        balance = self.load_data("sp500_balance_sheets")
+        cashflow = self.load_data("sp500_cashflow_statements")
+        fingerprints = self.__statement_fingerprints([income, balance, cashflow])
+
+        if not self.db.table_exists(table_name):
+            print(f"{table_name} does not exist yet, running a full build")
+            self.__full_combined_build(prices_table, table_name, fingerprints)
+            return
+
+        info = self.load_data("sp500_info")
+        macro_prices = self.load_data("macro_prices")
+
+        if self.db.table_exists(state_table):
+            previous = self.db.fetch_from_postgres(state_table)
+            previous = dict(zip(previous["Ticker"], previous["Statements_Hash"]))
+        else:
+            previous = {}
+        current = dict(zip(fingerprints["Ticker"], fingerprints["Statements_Hash"]))
+        latest_dates = self.db.fetch_latest_dates(table_name, "Ticker", "Period")
+        latest_prices = self.db.fetch_latest_dates(prices_table, "Ticker", "Date")
+
+        # None = rebuild the ticker's full history
+        start_dates = {}
+        for ticker in sorted(set(latest_prices) | set(current)):
+            if ticker not in latest_prices:
+                # No prices, so no rows in a full build either
+                continue
+            if previous.get(ticker) == current.get(ticker) and ticker in latest_dates:
+                start = pd.to_datetime(latest_dates[ticker]).normalize() + timedelta(days=1)
+                if pd.to_datetime(latest_prices[ticker]) >= start:
+                    start_dates[ticker] = start
+            else:
+                start_dates[ticker] = None
+        rebuilt = [t for t, start in start_dates.items() if start is None]
+        appended = [t for t, start in start_dates.items() if start is not None]
+        print(f"Incremental build: {len(appended)} tickers appended, {len(rebuilt)} rebuilt")
+
+        if not start_dates:
+            print(f"No new prices or statements, {table_name} is up to date")
+            self.db.upsert_to_postgres(fingerprints, state_table, ["Ticker"])
+            return
+
+        price_parts = []
+        if rebuilt:
+            price_parts.append(self.db.fetch_rows_since(prices_table, "Date", key_col="Ticker", keys=rebuilt))
+        if appended:
+            since = min(start_dates[t] for t in appended)
+            price_parts.append(self.db.fetch_rows_since(prices_table, "Date", since, "Ticker", appended))
+        prices = pd.concat(price_parts, ignore_index=True)
+
+        seed = self.db.fetch_latest_rows(table_name, "Ticker", "Period")
+        seed = seed[seed["Ticker"].isin(appended)]
+
+        try:
+            cleaner = YFinanceCleaner(info, income, balance, cashflow, prices, macro_prices)
+            df = cleaner.run(start_dates=start_dates, seed=seed)
+        except Exception as e:
+            print(f"Error building incremental YFinance data: {e}")
+            raise e
+
+        stored_cols = self.db.fetch_columns(table_name)
+        added = [col for col in df.columns if col not in stored_cols]
+        removed = [col for col in stored_cols if col not in df.columns]
+        if added or removed:
+            # Upserting would drop the new line items and NULL out the removed ones
+            print(f"Columns of {table_name} changed (added: {added}, removed: {removed}), running a full build")
+            self.__full_combined_build(prices_table, table_name, fingerprints)
+            return
+
+        self.db.upsert_to_postgres(df[stored_cols], table_name, ["Ticker", "Period"])
+        self.db.upsert_to_postgres(fingerprints, state_table, ["Ticker"])
+        print(f"Upserted {len(df)} rows into {table_name}")
+
 if __name__ == "__main__":
     db_config = {
         "user": "ais_sp500_db_user",
@@ -233,21 +620,17 @@ if __name__ == "__main__":
     for i in range(len(start_end_tuples)):
         start_date, end_date = start_end_tuples[i]
         replace = True if i == 0 else False
-        try:
-            pipeline.fetch_and_save_yfinance_data(start_date, end_date, replace)
-            pipeline.fetch_and_save_ais_data(start_date, end_date, save_folder, output_csv, replace)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-
-    # # Load and concatenate YFinance data
-    concatenated_df = pipeline.load_and_concat_yfinance_data()
-
-    if concatenated_df is not None:
-        pipeline.db.save_to_postgres(concatenated_df, "ais_port_financial_data_db", replace=True)
-        print("concatenated_df saved to PostgreSQL as 'ais_port_financial_data_db'")
-    else:
-        print("concatenated_df is empty.")
+        errors = pipeline.fetch_and_save_concurrently(
+            start_date, end_date, save_folder, output_csv, replace, long_prices=True
+        )
+        for branch, error in errors.items():
+            if error is not None:
+                import traceback
+                print(f"{branch} ingestion failed for {start_date} to {end_date}:")
+                traceback.print_exception(error)
+
+    # # Load and concatenate YFinance data, only recomputing what changed
+    pipeline.update_yfinance_combined_data(prices_table="sp500_prices_long")
 
     # Load AIS data
     ais_data = pipeline.load_data("ais_port_visits")
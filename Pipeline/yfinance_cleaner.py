@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 income_cols_to_drop = columns_to_drop = [
     "Restructuring And Mergern Acquisition",
@@ -94,14 +95,86 @@ columns_to_drop_balance = [
 text = "Gain Loss On Investment Securities	Short Term Debt Payments	Short Term Debt Issuance	Provisionand Write Offof Assets	Issuance Of Capital Stock	Common Stock Issuance	Change In Other Current Liabilities	Unrealized Gain Loss On Investment Securities	Gain Loss On Sale Of PPE	Earnings Losses From Equity Investments	Other Cash Adjustment Inside Changein Cash	Net Preferred Stock Issuance	Preferred Stock Issuance	Net Foreign Currency Exchange Gain Loss	Amortization Of Securities	Net Intangibles Purchase And Sale	Purchase Of Intangibles	Cash From Discontinued Financing Activities	Cash From Discontinued Investing Activities	Cash From Discontinued Operating Activities	Preferred Stock Dividend Paid	Dividend Received Cfo	Preferred Stock Payments	Net Investment Properties Purchase And Sale	Sale Of Investment Properties	Purchase Of Investment Properties	Other Cash Adjustment Outside Changein Cash	Change In Interest Payable	Dividends Received Cfi	Sale Of Intangibles	Excess Tax Benefit From Stock Based Compensation	Interest Received Cfi	Cash Flow From Discontinued Operation	Depletion	Interest Paid Cff	Taxes Refund Paid	Cash Flowsfromusedin Operating Activities Direct	Classesof Cash Payments	Other Cash Paymentsfrom Operating Activities	Paymentson Behalfof Employees	Classesof Cash Receiptsfrom Operating Activities	Other Cash Receiptsfrom Operating Activities	Dividend Paid Cfo	Interest Paid Cfo"
 cashlow_cols_to_drop = text.split("	")
 
+ID_COLS = ["Ticker", "Period"]
+
 class YFinanceCleaner:
-    def __init__(self, info, income, balance, cashflow, price, macro_price):
+    def __init__(self, info, income, balance, cashflow, price, macro_price, min_coverage=None):
+        """
+        min_coverage: optional minimum share of non-null rows a statement line item needs
+            to be kept, instead of the hard-coded drop lists. The kept columns then depend on
+            the data, so a stored combined table can change schema between runs.
+        """
         self.sp500_info = info
-        self.income = self.__clean_sp500_dataframe(income, columns_to_drop, 10)
-        self.balance = self.__clean_sp500_dataframe(balance, columns_to_drop_balance, 10)
-        self.cashflow = self.__clean_sp500_dataframe(cashflow, cashlow_cols_to_drop, 10)
+        self.min_coverage = min_coverage
+        self.statements = self.__to_long([
+            self.__clean_sp500_dataframe(income, self.__columns_to_drop(income, columns_to_drop), 10),
+            self.__clean_sp500_dataframe(balance, self.__columns_to_drop(balance, columns_to_drop_balance), 10),
+            self.__clean_sp500_dataframe(cashflow, self.__columns_to_drop(cashflow, cashlow_cols_to_drop), 10),
+        ])
         self.price, self.dropped_price_cols = self.__clean_sp500_price_df(price)
         self.macro_price, self.dropped_macro_price_cols = self.__clean_sp500_price_df(macro_price)
+    def __columns_to_drop(self, df: pd.DataFrame, hard_coded: list) -> list:
+        """
+        Pick the statement columns to drop.
+        With min_coverage set, drops line items reported for fewer than min_coverage
+        of the rows; otherwise uses the hard-coded list.
+        """
+        if self.min_coverage is None:
+            return [col for col in hard_coded if col in df.columns]
+        value_cols = [col for col in df.columns if col not in ID_COLS + ["Statement"]]
+        coverage = df[value_cols].notna().mean()
+        sparse_cols = coverage.index[coverage < self.min_coverage].tolist()
+        return sparse_cols + [col for col in ["Statement"] if col in df.columns]
+
+    def __to_long(self, dfs: list[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Stack the numeric line items of cleaned wide statements into one long
+        (Ticker, Period, LineItem, Value) frame. Only reported values are kept.
+        Ticker, Period and LineItem are categorical and Value stays float64, so the
+        sparse line items cost nothing and no precision is lost.
+        Non-numeric columns are kept wide in self.statement_labels, and the original
+        column order in self.statement_columns.
+        """
+        line_items, parts, labels = {}, [], []
+        self.statement_columns = []
+        for df in dfs:
+            value_cols = [col for col in df.columns if col not in ID_COLS]
+            self.statement_columns += [col for col in value_cols if col not in self.statement_columns]
+            label_cols = [col for col in value_cols if not pd.api.types.is_numeric_dtype(df[col])]
+            if label_cols:
+                labels.append(df[ID_COLS + label_cols])
+            value_cols = [col for col in value_cols if col not in label_cols]
+            for col in value_cols:
+                line_items.setdefault(col, len(line_items))
+            values = df[value_cols].to_numpy(dtype="float64")
+            reported = ~np.isnan(values)
+            # Unparseable periods never match a price date
+            reported[df["Period"].isna().to_numpy()] = False
+            rows, cols = reported.nonzero()
+            parts.append(pd.DataFrame({
+                "Ticker": df["Ticker"].astype(str).to_numpy()[rows],
+                "Period": df["Period"].to_numpy()[rows],
+                "LineItem": np.array([line_items[col] for col in value_cols], dtype="int32")[cols],
+                "Value": values[rows, cols],
+            }))
+        self.statement_labels = self.__merge_labels(labels)
+        long_df = pd.concat(parts, ignore_index=True)
+        long_df["Ticker"] = long_df["Ticker"].astype("category")
+        long_df["Period"] = long_df["Period"].astype("category")
+        long_df["LineItem"] = pd.Categorical.from_codes(long_df["LineItem"], categories=list(line_items))
+        return long_df
+
+    def __merge_labels(self, labels: list[pd.DataFrame]):
+        """Outer-join the non-numeric statement columns on (Ticker, Period), first value wins."""
+        merged = None
+        for df in labels:
+            df = df.assign(Ticker=df["Ticker"].astype(str)).drop_duplicates(subset=ID_COLS).set_index(ID_COLS)
+            if merged is None:
+                merged = df
+            else:
+                merged = merged.combine_first(df)
+        return merged
+
     def __clean_sp500_dataframe(self, df: pd.DataFrame, columns: list, threshold:int):
         """Clean SP500 DF
         Input:
@@ -130,40 +203,63 @@ class YFinanceCleaner:
             Input: df: either sp500_prices or macro prices
             Output: (df, list of dropped cols)
             """
+            if self.__is_long_price_df(df):
+                # Long form (Ticker, Date, Close): drop missing rows, not columns
+                df.dropna(subset=["Close"], inplace=True)
+                return (df, [])
             nan_columns = df.columns[df.isna().any()].tolist()
             df.drop(columns=nan_columns, inplace=True) 
             return (df, nan_columns)
 
-    def __build_combined_quarterly(self,dfs: list[pd.DataFrame]) -> pd.DataFrame:
-        # Each df in “dfs” must have columns ["Ticker", "Period", ...fundamentals...]
-        indexed = []
-        for df in dfs:
-            temp = df.copy()
-            temp = temp.set_index(["Ticker", "Period"], drop=False)
-            indexed.append(temp)
-        # Start from the first
-        combined = indexed[0]
-        for other in indexed[1:]:
-            # Drop "Ticker" and "Period" from `other` so we don't duplicate those columns
-            combined = combined.join(
-                other.drop(columns=["Ticker", "Period"]),
-                how="outer",
-                lsuffix="",
-                rsuffix=""
-            )
-        # Bring "Ticker" and "Period" back into columns
-        combined = combined.reset_index(drop=True)
-        # Sort for merge_asof
-        combined.sort_values(["Ticker", "Period"], inplace=True)
+    def __is_long_price_df(self, df):
+        """True if df is a long-form (Ticker, Date, Close) price table."""
+        return {"Ticker", "Date", "Close"}.issubset(df.columns)
+
+    def __build_combined_quarterly(self, statements: pd.DataFrame) -> pd.DataFrame:
+        # statements is the long (Ticker, Period, LineItem, Value) frame from __to_long.
+        # Scatter the values straight into one (Ticker, Period) x LineItem array by their
+        # category codes, instead of outer-joining the wide statement frames
+        tickers = statements["Ticker"].cat
+        periods = statements["Period"].cat
+        line_items = statements["LineItem"].cat
+        n_periods, n_items = len(periods.categories), len(line_items.categories)
+        keys = tickers.codes.to_numpy(dtype="int64") * n_periods + periods.codes.to_numpy()
+        present = np.zeros(len(tickers.categories) * n_periods, dtype=bool)
+        present[keys] = True
+        row_keys = present.nonzero()[0]
+        rows = (np.cumsum(present) - 1)[keys]
+        cols = line_items.codes.to_numpy()
+        values = statements["Value"].to_numpy()
+
+        cells = rows * n_items + cols
+        if np.bincount(cells).max(initial=0) > 1:
+            # A line item reported twice for the same (Ticker, Period) keeps the first value
+            _, first = np.unique(cells, return_index=True)
+            rows, cols, values = rows[first], cols[first], values[first]
+        combined = np.full((len(row_keys), n_items), np.nan)
+        combined[rows, cols] = values
+
+        index = pd.MultiIndex(
+            levels=[tickers.categories.astype(str), periods.categories],
+            codes=[row_keys // n_periods, row_keys % n_periods],
+            names=ID_COLS,
+        )
+        combined = pd.DataFrame(combined, index=index, columns=line_items.categories.astype(str))
+        labels = self.statement_labels
+        if labels is not None:
+            if labels.index.isin(index).all():
+                # Insert the few label columns in place, without copying the value block
+                for col in sorted(labels.columns, key=self.statement_columns.index):
+                    combined.insert(self.statement_columns.index(col), col, labels[col].reindex(index))
+            else:
+                combined = combined.join(labels, how="outer")[self.statement_columns]
+        # Bring "Ticker" and "Period" back into columns, sorted for merge_asof
+        combined.reset_index(inplace=True)
         return combined
 
-    def run(self):
-        combined_quarterly = self.__build_combined_quarterly([self.income, self.balance, self.cashflow])
-        # 1) Optional: keep only one row per (Ticker, Period) in the quarterly table
-        combined_quarterly = combined_quarterly.drop_duplicates(subset=["Ticker","Period"])
-        combined_quarterly.to_csv("sp500_combined_quarterly.csv", index=False)
-        #5) Take your daily price table (sp500_prices) and turn it into long form.
-        prices = self.price.copy()
+    def __stack_wide_prices(self, price_df: pd.DataFrame) -> pd.DataFrame:
+        """Turn the wide Date x <Ticker>_Close table into long (Period, Ticker, Price) form."""
+        prices = price_df.copy()
         prices = prices.rename(columns={"Date": "Period"})
         prices["Period"] = pd.to_datetime(prices["Period"])
 
@@ -183,10 +279,45 @@ class YFinanceCleaner:
         .rename(columns={0: "Price",        # rename the stacked‐value column
                         "level_1": "Ticker"}) 
         )
-        
+        return prices_long
+
+    def __filter_from_start(self, prices_long: pd.DataFrame, start_dates: dict) -> pd.DataFrame:
+        """
+        Keep only tickers in start_dates, from their start date onwards.
+        A start date of None keeps the ticker's full history.
+        """
+        tickers = prices_long["Ticker"].astype(str)
+        starts = pd.to_datetime(tickers.map(start_dates))
+        keep = tickers.isin(start_dates.keys()) & (starts.isna() | (prices_long["Period"] >= starts))
+        return prices_long[keep]
+
+    def run(self, start_dates: dict = None, seed: pd.DataFrame = None):
+        """
+        Build the daily fundamentals table.
+        start_dates: optional {Ticker: first Period to build}. When given, only these
+            tickers are built, from that date on (None = full history for that ticker).
+        seed: optional last previously built row per ticker. Its fundamentals are
+            forward-filled into the new rows so incremental builds match a full rebuild.
+        """
+        combined_quarterly = self.__build_combined_quarterly(self.statements)
+        # 1) Optional: keep only one row per (Ticker, Period) in the quarterly table
+        combined_quarterly = combined_quarterly.drop_duplicates(subset=["Ticker","Period"])
+        combined_quarterly.to_csv("sp500_combined_quarterly.csv", index=False)
+        #5) Take your daily price table (sp500_prices) and turn it into long form.
+        if self.__is_long_price_df(self.price):
+            # Already long (sp500_prices_long), no reshape needed
+            prices_long = (
+                self.price[["Ticker", "Date", "Close"]]
+                .rename(columns={"Date": "Period", "Close": "Price"})
+            )
+        else:
+            prices_long = self.__stack_wide_prices(self.price)
+
         # 0) identical dtype against; coerce & sort
         for df in (prices_long, combined_quarterly):
             df["Period"] = pd.to_datetime(df["Period"], errors="coerce")
+        if start_dates is not None:
+            prices_long = self.__filter_from_start(prices_long, start_dates)
         prices_long        = prices_long.sort_values(["Ticker", "Period"])
         combined_quarterly = combined_quarterly.sort_values(["Ticker", "Period"])
 
@@ -195,13 +326,25 @@ class YFinanceCleaner:
         quarter_idx = combined_quarterly.set_index(["Ticker", "Period"])
 
         # 2) left-join then forward-fill within each ticker
+        df_daily_fund = daily_idx.join(quarter_idx, how="left")   # align on exact dates
+        seed_idx = None
+        if seed is not None and not seed.empty:
+            # Prepend the previous state so ffill carries it into the new range
+            seed_cols = [c for c in quarter_idx.columns if c in seed.columns]
+            seed = seed.assign(Ticker=seed["Ticker"].astype(str), Period=pd.to_datetime(seed["Period"]))
+            seed_idx = seed.set_index(["Ticker", "Period"])[seed_cols]
+            df_daily_fund.index = df_daily_fund.index.set_levels(
+                df_daily_fund.index.levels[0].astype(str), level=0
+            )
+            df_daily_fund = pd.concat([seed_idx, df_daily_fund]).sort_index()
         df_daily_fund = (
-        daily_idx
-        .join(quarter_idx, how="left")        # align on exact dates
+        df_daily_fund
         .groupby(level=0)                     # level 0 = Ticker
         .ffill()                              # carry last available quarter fwd
-        .reset_index()                        # back to flat columns
-        )  
+        )
+        if seed_idx is not None:
+            df_daily_fund = df_daily_fund[~df_daily_fund.index.isin(seed_idx.index)]
+        df_daily_fund = df_daily_fund.reset_index()   # back to flat columns
 
         # 3) drop all rows from self.dropped_price_cols
         df_daily_fund.drop(columns=self.dropped_price_cols, inplace=True, errors='ignore')
@@ -1,7 +1,11 @@
 #This script will pull data from yfinance's API, save as csv and send to a DB
+import threading
 import yfinance as yf
 import pandas as pd
 
+# yf.download resets and polls module-level state, so concurrent calls can clobber each other
+_download_lock = threading.Lock()
+
 class YFinanceFetcher:
     def __init__(self, start_date, end_date):
         self.start_date = start_date
@@ -29,7 +33,8 @@ class YFinanceFetcher:
         Fetches historical stock data for a given ticker from YFinance.
         """
         # download the data
-        df = yf.download(tickers, start=start, end=end)
+        with _download_lock:
+            df = yf.download(tickers, start=start, end=end)
         # reset index to make 'Date' a column
         if isinstance(df.columns, pd.MultiIndex):
                 print("MultiIndex")
@@ -45,7 +50,43 @@ class YFinanceFetcher:
         print(df.columns)
         df = df[["Date"] + close_cols]
         return df
-    
+
+    def get_ticker_price_long(self, tickers, start, end, batch_size=100):
+        """
+        Fetches Close prices for the given tickers in batches of batch_size.
+        Returns a long-form DataFrame with columns (Ticker, Date, Close).
+        Close is split- and dividend-adjusted as of the fetch date.
+        """
+        columns = ["Ticker", "Date", "Close"]
+        batches = []
+        for i in range(0, len(tickers), batch_size):
+            batch = list(tickers[i:i + batch_size])
+            with _download_lock:
+                df = yf.download(batch, start=start, end=end, progress=False)
+            if df.empty:
+                print(f"No prices returned for batch {i // batch_size + 1} ({start} to {end})")
+                continue
+            long_df = self.__stack_field(df, "Close", batch).reset_index()[columns]
+            batches.append(long_df)
+            print(f"Fetched {len(long_df)} Close prices for batch {i // batch_size + 1} ({start} to {end})")
+
+        if not batches:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(batches, ignore_index=True)
+
+    def __stack_field(self, df, field, batch):
+        """Turn one field of a yf.download frame into a long Series indexed by (Ticker, Date)."""
+        values = df[field]
+        if isinstance(values, pd.Series):
+            values = values.to_frame(batch[0])
+        return (
+            values
+            .rename_axis(index="Date", columns="Ticker")
+            .stack()
+            .rename(field)
+            .reorder_levels(["Ticker", "Date"])
+        )
+
     def get_sp500_statements(self,symbols):
         income, balance, cashflow = [], [], []
 